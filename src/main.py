@@ -1,33 +1,93 @@
 import glob
+import logging
 import os
-from collections import Counter
-from typing import Dict, List, Optional, Set, Union
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from openpyxl.worksheet.worksheet import Worksheet
 from pandas.tseries.offsets import DateOffset
 
-
-def read_source_excel(file_path: str, sheet_name: str) -> Optional[pd.DataFrame]:
+logger = logging.getLogger(__name__)
+
+# Столбцы исходного листа, которые используются при форматировании
+SOURCE_COLUMNS: Tuple[str, ...] = ("Номенклатура", "SN", "Warranty", "Начало гарантии")
+SOURCE_DTYPES: Dict[str, str] = {
+    "Номенклатура": "string",
+    "SN": "string",
+    "Warranty": "string",
+}
+SOURCE_DATE_COLUMNS: Tuple[str, ...] = ("Начало гарантии",)
+
+# Все возможные уровни поддержки; фиксированный набор категорий сохраняет
+# тип category при объединении данных из разных файлов
+SUPPORT_LEVEL_DTYPE = pd.CategoricalDtype(
+    [
+        "Базовый",
+        "Базовый+невозврат",
+        "Расширенный",
+        "Расширенный+невозврат",
+        "Премиум",
+        "Премиум+невозврат",
+        "Гарантия",
+        "Не найдено",
+    ]
+)
+
+# Тип столбца Срок; сроки вне диапазона типа заменяются на <NA>, а не обрезаются
+TERM_DTYPE = "Int32"
+_TERM_MAX = 2**31 - 1
+
+# Уровни поддержки (обычный, +невозврат) по началу значения Warranty
+_SUPPORT_LEVELS_BY_PREFIX: Dict[str, Tuple[str, str]] = {
+    "base": ("Базовый", "Базовый+невозврат"),
+    "extended": ("Расширенный", "Расширенный+невозврат"),
+    "premium": ("Премиум", "Премиум+невозврат"),
+}
+_SUPPORT_PREFIX_RE = re.compile("|".join(_SUPPORT_LEVELS_BY_PREFIX))
+
+# Срок гарантии в значении Warranty, например "Premium5Y" -> "5"
+_YEAR_RE = re.compile(r"(\d+)Y")
+
+
+def read_source_excel(
+    file_path: str,
+    sheet_name: str,
+    usecols: Sequence[str] = SOURCE_COLUMNS,
+    dtype: Optional[Dict[str, str]] = None,
+    parse_dates: Sequence[str] = SOURCE_DATE_COLUMNS,
+) -> Optional[pd.DataFrame]:
     """
     Читает данные из исходного Excel файла.
 
     Args:
         file_path (str): Путь к Excel файлу
         sheet_name (str): Название листа для чтения
+        usecols (Sequence[str]): Столбцы, которые нужно прочитать
+        dtype (Optional[Dict[str, str]]): Типы столбцов (по умолчанию SOURCE_DTYPES)
+        parse_dates (Sequence[str]): Столбцы, приводимые к datetime64
 
     Returns:
         Optional[pd.DataFrame]: DataFrame с данными или None в случае ошибки
     """
+    if dtype is None:
+        dtype = SOURCE_DTYPES
     try:
-        return pd.read_excel(file_path, sheet_name=sheet_name)
+        # pandas сам открывает .xlsx через openpyxl в режиме read_only
+        df = pd.read_excel(
+            file_path, sheet_name=sheet_name, usecols=list(usecols), dtype=dtype
+        )
+        # Некорректные даты превращаем в NaT
+        for column in parse_dates:
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+        return df
     except Exception as e:
         print(f"Ошибка при чтении файла: {e}")
         return None
 
 
+@lru_cache(maxsize=None)
 def map_support_level(warranty: str) -> str:
     """
     Преобразует значение гарантии в соответствующий уровень поддержки.
@@ -45,19 +105,11 @@ def map_support_level(warranty: str) -> str:
         return "Не найдено"
     if "гарантия" in w:
         return "Гарантия"
-    if w.startswith("base"):
-        if "невозврат" in w:
-            return "Базовый+невозврат"
-        return "Базовый"
-    if w.startswith("extended"):
-        if "невозврат" in w:
-            return "Расширенный+невозврат"
-        return "Расширенный"
-    if w.startswith("premium"):
-        if "невозврат" in w:
-            return "Премиум+невозврат"
-        return "Премиум"
-    return "Не найдено"
+    match = _SUPPORT_PREFIX_RE.match(w)
+    if match is None:
+        return "Не найдено"
+    base, non_return = _SUPPORT_LEVELS_BY_PREFIX[match.group()]
+    return non_return if "невозврат" in w else base
 
 
 def format_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -71,86 +123,138 @@ def format_data(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Отформатированный DataFrame с нужными столбцами
     """
     # Срок: только цифра
-    df["Срок"] = df["Warranty"].str.extract(r"(\d+)Y")[0]
-
-    # SN OY: всегда строка, убираем .0 на конце
-    def clean_sn(sn: Union[str, float, int]) -> str:
-        """
-        Очищает серийный номер от лишних символов.
+    df["Срок"] = df["Warranty"].str.extract(_YEAR_RE, expand=False)
 
-        Args:
-            sn (Union[str, float, int]): Исходный серийный номер
-
-        Returns:
-            str: Очищенный серийный номер
-        """
-        s = str(sn)
-        if s.endswith(".0"):
-            s = s[:-2]
-        return s
-
-    df["SN"] = df["SN"].apply(clean_sn)
+    # SN OY: всегда строка, убираем .0 на конце. Пустой SN остаётся <NA>
+    # (а не текстом "nan") и не учитывается в числе уникальных SN
+    sn = df["SN"].astype("string")
+    df["SN"] = sn.mask(sn.str.endswith(".0", na=False), sn.str.slice(0, -2))
     # Даты: формат YYYY-MM-DD, некорректные значения превращаем в пустую строку
-    start_dates = pd.to_datetime(df["Начало гарантии"], errors="coerce")
+    # (столбец уже приведён к datetime64 в read_source_excel)
+    start_dates = df["Начало гарантии"]
     df["Дата начала"] = start_dates.dt.strftime("%Y-%m-%d").fillna("")
 
-    # Дата окончания: дата начала + срок (в годах)
-    def calc_end_date(row: pd.Series) -> str:
-        """
-        Рассчитывает дату окончания гарантии.
-
-        Args:
-            row (pd.Series): Строка данных с датой начала и сроком
-
-        Returns:
-            str: Дата окончания в формате YYYY-MM-DD или пустая строка в случае ошибки
-        """
+    # Дата окончания: дата начала + срок (в годах).
+    # Сроков всего несколько (1/3/5), поэтому сдвигаем даты группами по сроку.
+    years = pd.to_numeric(df["Срок"], errors="coerce")
+    end_dates = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    for k in years.dropna().unique():
+        mask = years == k
+        offset = DateOffset(years=int(k))
         try:
-            start = pd.to_datetime(row["Дата начала"], errors="coerce")
-            years = int(row["Срок"])
-            if pd.isna(start) or pd.isna(years):
-                return ""
-            end = start + DateOffset(years=years)
-            return end.strftime("%Y-%m-%d")
-        except Exception:
-            return ""
-
-    df["Дата окончания"] = df.apply(calc_end_date, axis=1)
-    # Форматируем уровень поддержки
-    df["Уровень поддержки"] = df["Warranty"].apply(map_support_level)
+            end_dates[mask] = start_dates[mask] + offset
+        except (OverflowError, pd.errors.OutOfBoundsDatetime):
+            # Часть дат группы выходит за пределы datetime64: сдвигаем построчно,
+            # для таких строк оставляем NaT (пустая строка)
+            for idx in mask[mask].index:
+                try:
+                    end_dates[idx] = start_dates[idx] + offset
+                except (OverflowError, pd.errors.OutOfBoundsDatetime):
+                    continue
+    df["Дата окончания"] = end_dates.dt.strftime("%Y-%m-%d").fillna("")
+
+    # Форматируем уровень поддержки: различных значений Warranty мало,
+    # поэтому map_support_level вызывается только для уникальных
+    mapping = {w: map_support_level(w) for w in df["Warranty"].dropna().unique()}
+    df["Уровень поддержки"] = df["Warranty"].map(mapping).fillna("Не найдено")
     # Формируем итоговый датафрейм с нужными столбцами и переименованием
     result = pd.DataFrame(
         {
             "Наименование": df["Номенклатура"],
             "SN OY": df["SN"],
-            "Уровень поддержки": df["Уровень поддержки"],
-            "Срок": df["Срок"],
+            "Уровень поддержки": df["Уровень поддержки"].astype(SUPPORT_LEVEL_DTYPE),
+            "Срок": years.where(years <= _TERM_MAX).astype(TERM_DTYPE),
             "Дата начала": df["Дата начала"],
             "Дата окончания": df["Дата окончания"],
+            # Служебный столбец для аналитики, в Excel не выгружается
+            "_end_dt": end_dates,
         }
     )
     return result
 
 
-def check_duplicates(new_data: pd.DataFrame, target_file: str) -> pd.DataFrame:
+def _load_and_format(file_path: str, sheet_name: str) -> Optional[pd.DataFrame]:
+    """
+    Читает и форматирует один исходный файл (выполняется в отдельном процессе).
+
+    Args:
+        file_path (str): Путь к Excel файлу
+        sheet_name (str): Название листа для чтения
+
+    Returns:
+        Optional[pd.DataFrame]: Отформатированный DataFrame или None, если файл пропущен
+    """
+    print(f"Чтение файла: {file_path}")
+    source_data = read_source_excel(file_path, sheet_name)
+    if source_data is None:
+        print(f"Пропущен файл {file_path} (нет листа '{sheet_name}' или ошибка чтения)")
+        return None
+    return format_data(source_data)
+
+
+def check_duplicates(
+    new_data: pd.DataFrame, existing: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
     """
-    Проверяет наличие дубликатов в целевом файле по SN OY.
+    Убирает дубликаты по SN OY из новых данных и относительно уже имеющихся.
 
     Args:
         new_data (pd.DataFrame): Новые данные для добавления
-        target_file (str): Путь к целевому файлу
+        existing (Optional[pd.DataFrame]): Уже имеющиеся данные (результат
+            format_data или лист "Гарантии" из target.xlsx) или None
 
     Returns:
         pd.DataFrame: Объединенные данные без дубликатов
     """
-    try:
-        existing_data = pd.read_excel(target_file)
-        combined_data = pd.concat([existing_data, new_data])
-        # Оставляем только уникальные SN OY, оставляя первую встреченную строку
-        combined_data = combined_data.drop_duplicates(subset=["SN OY"])
-        return combined_data
-    except FileNotFoundError:
+    # Оставляем только уникальные SN OY, оставляя первую встреченную строку.
+    # copy(): результат drop_duplicates помечен как срез исходного фрейма
+    new_data = new_data.drop_duplicates(subset=["SN OY"]).copy()
+    if existing is None or existing.empty:
         return new_data
+    existing = existing.drop_duplicates(subset=["SN OY"])
+    if "_end_dt" not in existing.columns:
+        # Данные прочитаны из target.xlsx: приводим их к схеме format_data,
+        # чтобы типы столбцов не терялись при объединении
+        terms = pd.to_numeric(existing["Срок"], errors="coerce")
+        existing = existing.assign(
+            **{
+                "Наименование": existing["Наименование"].astype("string"),
+                "SN OY": existing["SN OY"].astype("string"),
+                "Уровень поддержки": existing["Уровень поддержки"].astype(
+                    SUPPORT_LEVEL_DTYPE
+                ),
+                "Срок": terms.where(terms <= _TERM_MAX).astype(TERM_DTYPE),
+                "Дата начала": existing["Дата начала"].fillna(""),
+                "Дата окончания": existing["Дата окончания"].fillna(""),
+                # Служебный столбец с датой окончания в файл не пишется
+                "_end_dt": pd.to_datetime(
+                    existing["Дата окончания"], errors="coerce"
+                ),
+            }
+        )
+    new_data = new_data[~new_data["SN OY"].isin(existing["SN OY"])]
+    return pd.concat([existing, new_data], copy=False)
+
+
+def _count_stats(counts: pd.Series, label: str, n: int) -> pd.DataFrame:
+    """
+    Собирает лист статистики из посчитанных количеств.
+
+    Args:
+        counts (pd.Series): Количество записей по значениям
+        label (str): Название столбца со значениями
+        n (int): Общее количество записей
+
+    Returns:
+        pd.DataFrame: Значение, количество и процент от общего числа
+    """
+    return pd.DataFrame(
+        {
+            label: counts.index,
+            "Количество": counts.to_numpy(),
+            "Процент": (counts.to_numpy() / n * 100).round(1),
+        }
+    )
 
 
 def generate_analytics(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
@@ -163,32 +267,42 @@ def generate_analytics(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     Returns:
         Dict[str, pd.DataFrame]: Словарь с листами аналитики
     """
-    print("Начинаем генерацию аналитики...")
+    logger.info("Начинаем генерацию аналитики...")
+    n = len(df)
 
     # Статистика по уровням поддержки
-    print("Генерируем статистику по уровням поддержки...")
-    support_stats = df["Уровень поддержки"].value_counts().reset_index()
-    support_stats.columns = ["Уровень поддержки", "Количество"]
-    support_stats["Процент"] = (support_stats["Количество"] / len(df) * 100).round(1)
-    print(f"Статистика по уровням поддержки:\n{support_stats}")
+    logger.info("Генерируем статистику по уровням поддержки...")
+    support_counts = (
+        df.groupby("Уровень поддержки", observed=True)
+        .size()
+        .sort_values(ascending=False, kind="stable")
+    )
+    support_stats = _count_stats(support_counts, "Уровень поддержки", n)
+    logger.debug("Статистика по уровням поддержки: %d строк", len(support_stats))
 
     # Статистика по срокам
-    print("Генерируем статистику по срокам...")
-    term_stats = df["Срок"].value_counts().reset_index()
-    term_stats.columns = ["Срок (лет)", "Количество"]
-    term_stats["Процент"] = (term_stats["Количество"] / len(df) * 100).round(1)
-    print(f"Статистика по срокам:\n{term_stats}")
-
-    # Статистика по годам окончания гарантии
-    print("Генерируем статистику по годам окончания...")
-    df["Год окончания"] = pd.to_datetime(df["Дата окончания"]).dt.year
-    year_stats = df["Год окончания"].value_counts().sort_index().reset_index()
-    year_stats.columns = ["Год окончания", "Количество"]
-    year_stats["Процент"] = (year_stats["Количество"] / len(df) * 100).round(1)
-    print(f"Статистика по годам окончания:\n{year_stats}")
+    logger.info("Генерируем статистику по срокам...")
+    term_counts = df.groupby("Срок", observed=True).size()
+    term_stats = _count_stats(
+        term_counts.sort_values(ascending=False, kind="stable"), "Срок (лет)", n
+    )
+    logger.debug("Статистика по срокам: %d строк", len(term_stats))
+
+    # Статистика по годам окончания гарантии (по сохранённому datetime64)
+    logger.info("Генерируем статистику по годам окончания...")
+    year_counts = df["_end_dt"].dt.year.value_counts().sort_index()
+    year_stats = _count_stats(year_counts, "Год окончания", n)
+    logger.debug("Статистика по годам окончания: %d строк", len(year_stats))
 
     # Общая статистика
-    print("Генерируем общую статистику...")
+    logger.info("Генерируем общую статистику...")
+    # Средний срок считаем по уже посчитанной гистограмме сроков
+    term_total = term_counts.sum()
+    avg_term = (
+        round((term_counts.index.to_numpy(float) * term_counts).sum() / term_total, 1)
+        if term_total
+        else None
+    )
     total_stats = pd.DataFrame(
         {
             "Показатель": [
@@ -199,15 +313,15 @@ def generate_analytics(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
                 "Максимальная дата окончания",
             ],
             "Значение": [
-                len(df),
+                n,
                 df["SN OY"].nunique(),
-                df["Срок"].astype(float).mean().round(1),
+                avg_term,
                 df["Дата начала"].min(),
                 df["Дата окончания"].max(),
             ],
         }
     )
-    print(f"Общая статистика:\n{total_stats}")
+    logger.debug("Общая статистика: %d строк", len(total_stats))
 
     result = {
         "Общая статистика": total_stats,
@@ -216,10 +330,28 @@ def generate_analytics(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         "По годам окончания": year_stats,
     }
 
-    print("Аналитика успешно сгенерирована")
+    logger.info("Аналитика успешно сгенерирована")
     return result
 
 
+def column_widths(df: pd.DataFrame) -> List[int]:
+    """
+    Рассчитывает ширину столбцов по самому длинному значению (включая заголовок).
+
+    Args:
+        df (pd.DataFrame): Данные листа
+
+    Returns:
+        List[int]: Ширина каждого столбца с запасом в 2 символа
+    """
+    widths: List[int] = []
+    for column in df.columns:
+        lengths = df[column].astype(str).str.len()
+        max_length = int(lengths.max()) if len(lengths) else 0
+        widths.append(max(len(str(column)), max_length) + 2)
+    return widths
+
+
 def save_to_excel(df: pd.DataFrame, target_file: str) -> None:
     """
     Сохраняет данные в целевой Excel файл.
@@ -229,48 +361,59 @@ def save_to_excel(df: pd.DataFrame, target_file: str) -> None:
         target_file (str): Путь к целевому файлу
     """
     try:
-        print("Начинаем сохранение данных в Excel...")
+        logger.info("Начинаем сохранение данных в Excel...")
         # Создаем Excel writer
-        with pd.ExcelWriter(target_file, engine="openpyxl") as writer:
-            print("Сохраняем основные данные...")
-            # Сохраняем основные данные
-            df.to_excel(writer, sheet_name="Гарантии", index=False)
-
-            print("Генерируем аналитику...")
+        with pd.ExcelWriter(target_file, engine="xlsxwriter") as writer:
+            logger.info("Сохраняем основные данные...")
+            # Сохраняем основные данные без служебных столбцов. Пишем строки
+            # напрямую через xlsxwriter: to_excel проверяет тип каждой ячейки
+            sheet_data = df.loc[:, ~df.columns.str.startswith("_")]
+            worksheet = writer.book.add_worksheet("Гарантии")
+            worksheet.write_row(
+                0,
+                0,
+                list(sheet_data.columns),
+                writer.book.add_format(
+                    {"bold": True, "border": 1, "align": "center", "valign": "top"}
+                ),
+            )
+            values = sheet_data.astype(object).where(sheet_data.notna(), None)
+            for row, row_values in enumerate(values.to_numpy(), start=1):
+                worksheet.write_row(row, 0, row_values)
+
+            # Цветовое форматирование
+            colorize_excel(writer, sheet_data, "Гарантии")
+
+            logger.info("Генерируем аналитику...")
             # Генерируем и сохраняем аналитику
             analytics = generate_analytics(df)
-            print(f"Создаем листы аналитики: {list(analytics.keys())}")
-
+            logger.info("Создаем листы аналитики: %s", list(analytics))
+
+            # Формат заголовков общий для всех листов аналитики
+            header_format = writer.book.add_format(
+                {
+                    "bold": True,
+                    "bg_color": "#E0E0E0",
+                    "border": 1,
+                    "align": "center",
+                    "valign": "top",
+                }
+            )
             for sheet_name, data in analytics.items():
-                print(f"Сохраняем лист '{sheet_name}'...")
+                logger.info("Сохраняем лист '%s'...", sheet_name)
                 data.to_excel(writer, sheet_name=sheet_name, index=False)
 
                 # Получаем лист для форматирования
                 worksheet = writer.sheets[sheet_name]
 
                 # Форматируем заголовки
-                for cell in worksheet[1]:
-                    cell.font = cell.font.copy(bold=True)
-                    cell.fill = PatternFill(
-                        start_color="E0E0E0", end_color="E0E0E0", fill_type="solid"
-                    )
-
-                # Автоматическая ширина столбцов
-                for column in worksheet.columns:
-                    max_length = 0
-                    column = [cell for cell in column]
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = max_length + 2
-                    worksheet.column_dimensions[column[0].column_letter].width = (
-                        adjusted_width
-                    )
-
-                print(f"Лист '{sheet_name}' отформатирован")
+                worksheet.write_row(0, 0, list(data.columns), header_format)
+
+                # Автоматическая ширина столбцов по данным в памяти
+                for col, width in enumerate(column_widths(data)):
+                    worksheet.set_column(col, col, width)
+
+                logger.info("Лист '%s' отформатирован", sheet_name)
 
         print(f"Данные успешно сохранены в файл {target_file}")
     except Exception as e:
@@ -278,80 +421,81 @@ def save_to_excel(df: pd.DataFrame, target_file: str) -> None:
         raise  # Добавляем raise для отладки
 
 
-def colorize_excel(target_file: str) -> None:
+def colorize_excel(writer: pd.ExcelWriter, df: pd.DataFrame, sheet_name: str) -> None:
     """
-    Применяет цветовое форматирование к Excel файлу.
+    Применяет цветовое форматирование к листу с данными.
+
+    Вызывается внутри открытого writer, поэтому книга записывается за один
+    проход и не перечитывается после сохранения.
 
     Args:
-        target_file (str): Путь к целевому файлу
+        writer (pd.ExcelWriter): Открытый writer с движком xlsxwriter
+        df (pd.DataFrame): Данные, записанные на лист
+        sheet_name (str): Название листа с данными
     """
     # Цвета для уровня поддержки
     support_colors: Dict[str, str] = {
-        "Базовый": "ADD8E6",  # светло-синий
-        "Базовый+невозврат": "87CEEB",  # синий
-        "Гарантия": "90EE90",  # зелёный
-        "Премиум": "FFFF99",  # жёлтый
-        "Премиум+невозврат": "FFA500",  # оранжевый
-        "Расширенный": "DDA0DD",  # фиолетовый
-        "Расширенный+невозврат": "FF6347",  # красный
-        "Не найдено": "D3D3D3",  # серый
+        "Базовый": "#ADD8E6",  # светло-синий
+        "Базовый+невозврат": "#87CEEB",  # синий
+        "Гарантия": "#90EE90",  # зелёный
+        "Премиум": "#FFFF99",  # жёлтый
+        "Премиум+невозврат": "#FFA500",  # оранжевый
+        "Расширенный": "#DDA0DD",  # фиолетовый
+        "Расширенный+невозврат": "#FF6347",  # красный
+        "Не найдено": "#D3D3D3",  # серый
     }
     # Цвета для срока
-    term_colors: Dict[str, str] = {
-        "1": "CCFFCC",  # светло-зелёный
-        "3": "FFFFCC",  # светло-жёлтый
-        "5": "FFE4B5",  # светло-оранжевый
+    term_colors: Dict[int, str] = {
+        1: "#CCFFCC",  # светло-зелёный
+        3: "#FFFFCC",  # светло-жёлтый
+        5: "#FFE4B5",  # светло-оранжевый
     }
     # Цвет для дубликатов SN OY
-    duplicate_sn_color: str = "FFC7CE"  # светло-красный
+    duplicate_sn_color: str = "#FFC7CE"  # светло-красный
 
-    wb = load_workbook(target_file)
-    ws: Worksheet = wb["Гарантии"]  # Теперь явно указываем лист "Гарантии"
+    if df.empty:
+        return
+    workbook = writer.book
+    worksheet = writer.sheets[sheet_name]
+    last_row = len(df)
 
-    # Найдём индексы нужных столбцов по заголовкам
-    header: Dict[str, int] = {
-        cell.value: idx
-        for idx, cell in enumerate(next(ws.iter_rows(min_row=1, max_row=1)), 1)
+    # Форматы создаём один раз на цвет
+    support_formats = {
+        k: workbook.add_format({"bg_color": v}) for k, v in support_colors.items()
     }
-    col_support = header.get("Уровень поддержки")
-    col_term = header.get("Срок")
-    col_sn = header.get("SN OY")
-
-    # Соберём все значения SN OY для поиска дубликатов
-    sn_values: List[str] = [
-        row[col_sn - 1].value for row in ws.iter_rows(min_row=2) if col_sn
-    ]
-    sn_counts = Counter(sn_values)
-    duplicate_sns: Set[str] = {sn for sn, count in sn_counts.items() if count > 1}
-
-    # Применяем цвета
-    for row in ws.iter_rows(min_row=2):
-        # Уровень поддержки
-        if col_support:
-            val = row[col_support - 1].value
-            color = support_colors.get(val, None)
-            if color:
-                row[col_support - 1].fill = PatternFill(
-                    start_color=color, end_color=color, fill_type="solid"
-                )
-        # Срок
-        if col_term:
-            val = str(row[col_term - 1].value)
-            color = term_colors.get(val, None)
-            if color:
-                row[col_term - 1].fill = PatternFill(
-                    start_color=color, end_color=color, fill_type="solid"
-                )
-        # Дубликаты SN OY
-        if col_sn:
-            val = row[col_sn - 1].value
-            if val in duplicate_sns:
-                row[col_sn - 1].fill = PatternFill(
-                    start_color=duplicate_sn_color,
-                    end_color=duplicate_sn_color,
-                    fill_type="solid",
-                )
-    wb.save(target_file)
+    term_formats = {
+        k: workbook.add_format({"bg_color": v}) for k, v in term_colors.items()
+    }
+    duplicate_format = workbook.add_format({"bg_color": duplicate_sn_color})
+
+    # Уровень поддержки и срок: точное совпадение значения ячейки
+    for column, formats in (
+        ("Уровень поддержки", support_formats),
+        ("Срок", term_formats),
+    ):
+        col = df.columns.get_loc(column)
+        for value, cell_format in formats.items():
+            worksheet.conditional_format(
+                1,
+                col,
+                last_row,
+                col,
+                {
+                    "type": "cell",
+                    "criteria": "==",
+                    # Текст в условии Excel берётся в кавычки, числа — нет
+                    "value": f'"{value}"' if isinstance(value, str) else value,
+                    "format": cell_format,
+                },
+            )
+
+    # Дубликаты SN OY: ищем по данным в памяти и перезаписываем только эти ячейки
+    col_sn = df.columns.get_loc("SN OY")
+    duplicated = df["SN OY"].duplicated(keep=False).to_numpy()
+    for row, sn in zip(duplicated.nonzero()[0], df["SN OY"].to_numpy()[duplicated]):
+        worksheet.write(
+            int(row) + 1, col_sn, None if pd.isna(sn) else sn, duplicate_format
+        )
 
 
 def main() -> None:
@@ -391,45 +535,35 @@ def main() -> None:
         print(f"Нет Excel-файлов в папке {input_dir}!")
         return
 
-    # Создаём новый файл с нужной шапкой
-    columns: List[str] = [
-        "Наименование",
-        "SN OY",
-        "Уровень поддержки",
-        "Срок",
-        "Дата начала",
-        "Дата окончания",
-    ]
-    pd.DataFrame(columns=columns).to_excel(target_file, index=False)
-    print(f"Создан новый файл {target_file} с нужной структурой.")
-
-    # Читаем и объединяем данные из всех файлов
-    all_data: List[pd.DataFrame] = []
-    for file in input_files:
-        print(f"Чтение файла: {file}")
-        source_data = read_source_excel(file, sheet_name)
-        if source_data is None:
-            print(f"Пропущен файл {file} (нет листа '{sheet_name}' или ошибка чтения)")
-            continue
-        formatted_data = format_data(source_data)
-        all_data.append(formatted_data)
+    # Читаем и форматируем файлы параллельно, по процессу на файл
+    with ProcessPoolExecutor() as executor:
+        all_data: List[pd.DataFrame] = [
+            df
+            for df in executor.map(
+                partial(_load_and_format, sheet_name=sheet_name), input_files
+            )
+            if df is not None
+        ]
 
     if not all_data:
         print("Нет данных для обработки!")
         return
 
-    # Объединяем все данные в один DataFrame
-    combined_data: pd.DataFrame = pd.concat(all_data, ignore_index=True)
+    # Объединяем все данные в один DataFrame. Столбцы у всех частей одинаковые,
+    # поэтому сортировка и лишнее копирование не нужны
+    combined_data: pd.DataFrame = pd.concat(
+        all_data, ignore_index=True, copy=False, sort=False
+    )
 
     # Проверяем дубликаты и получаем финальный набор данных
-    final_data: pd.DataFrame = check_duplicates(combined_data, target_file)
+    # (target.xlsx удалён выше, поэтому сравнивать с существующими данными не нужно)
+    final_data: pd.DataFrame = check_duplicates(combined_data)
 
-    # Сохраняем результат
+    # Сохраняем результат вместе с цветовым форматированием
     save_to_excel(final_data, target_file)
 
-    # Цветовое форматирование
-    colorize_excel(target_file)
-
 
 if __name__ == "__main__":
+    # Подробный вывод этапов и статистики: LOGLEVEL=INFO или LOGLEVEL=DEBUG
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "WARNING").upper())
     main()